@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-import threading
+import functools
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any
+from typing import Annotated, Any, Callable, TypeVar
 
-import joblib
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+import msgspec
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 
 from src.registry import read_production
-from src.train import train_and_promote
 
 
 def _project_root() -> Path:
@@ -17,18 +18,41 @@ def _project_root() -> Path:
     return Path(__file__).resolve().parents[1]
 
 
-_state_lock = threading.Lock()
-_model: Any | None = None
-_production_meta: dict[str, Any] = {}
-_model_load_error: str = ""
+# Serving state as one immutable snapshot: (model, predictor, production_meta, model_load_error).
+# `_load_model` publishes a new tuple with a single assignment, so readers unpack it without a lock.
+# The meta dict is never mutated after it has been published.
+_state: tuple[Any | None, Callable[[float], float] | None, dict[str, Any], str] = (
+    None,
+    None,
+    {},
+    "",
+)
+
+# Unpickled models keyed by (path, inode, mtime_ns, size); reloads of an unchanged file reuse the
+# object. Retraining swaps in a new file via `os.replace`, so the inode changes even when size and a
+# coarse-grained mtime do not.
+_model_cache: dict[tuple[str, int, int, int], Any] = {}
+
+
+def _make_predictor(model_obj: Any) -> Callable[[float], float]:
+    """
+    Wrap `model_obj.predict_one` in an LRU cache bound to that model instance.
+    A new model gets a new (empty) cache, so reloads never serve stale predictions.
+    """
+
+    @functools.lru_cache(maxsize=4096)
+    def predict_cached(height_cm: float) -> float:
+        return float(model_obj.predict_one(height_cm))
+
+    return predict_cached
 
 
 def _load_model() -> None:
     """
-    Load production metadata and model into module-global state.
-    Never raises; records errors into `_model_load_error`.
+    Load production metadata and model into the module-global `_state` snapshot.
+    Never raises; records errors into the snapshot's load-error slot.
     """
-    global _model, _production_meta, _model_load_error
+    global _state
 
     root_dir = _project_root()
     meta = read_production(root_dir)
@@ -46,48 +70,116 @@ def _load_model() -> None:
             if not model_path.is_absolute():
                 model_path = root_dir / model_path
 
-            model_obj = joblib.load(model_path)
-            if not hasattr(model_obj, "predict_one"):
-                raise TypeError("Loaded object does not implement predict_one(height_cm).")
+            st = model_path.stat()
+            cache_key = (str(model_path), st.st_ino, st.st_mtime_ns, st.st_size)
+            model_obj = _model_cache.get(cache_key)
+            if model_obj is None:
+                import joblib
+
+                # Array buffers are mapped read-only from the file, so every worker shares
+                # the same page-cache pages instead of holding a private copy.
+                model_obj = joblib.load(model_path, mmap_mode="r")
+                if not hasattr(model_obj, "predict_one"):
+                    raise TypeError("Loaded object does not implement predict_one(height_cm).")
+                # Warm-up call: surfaces a broken model at load time, not on the first request.
+                model_obj.predict_one(100.0)
+                # Only the current file version is worth keeping; drop stale entries.
+                _model_cache.clear()
+                _model_cache[cache_key] = model_obj
     except Exception as e:
         model_obj = None
         err = f"Failed to load production model: {e}"
 
-    with _state_lock:
-        _production_meta = meta if isinstance(meta, dict) else {}
-        _model = model_obj
-        _model_load_error = err
-
+    prev_model, prev_predictor, _, _ = _state
+    if model_obj is None:
+        predictor = None
+    elif model_obj is prev_model and prev_predictor is not None:
+        # Keep the warm prediction cache when a reload resolved to the same cached model.
+        predictor = prev_predictor
+    else:
+        predictor = _make_predictor(model_obj)
 
-app = FastAPI(title="Traceable Demo (DVC + MLflow + FastAPI)")
+    _state = (model_obj, predictor, meta if isinstance(meta, dict) else {}, err)
 
 
-@app.on_event("startup")
-def _startup() -> None:
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Load before serving; `_state` keeps a strong reference to the model for the app's lifetime.
     _load_model()
+    yield
+
 
+app = FastAPI(title="Traceable Demo (DVC + MLflow + FastAPI)", lifespan=lifespan)
 
-class RetrainRequest(BaseModel):
-    trainer: str = Field(..., min_length=1, max_length=200)
-    model_type: str = Field("constant")
-    y_value: float = Field(1.5)
 
+# Request bodies are decoded and validated by msgspec in one pass over the raw JSON bytes,
+# instead of FastAPI's pydantic body parsing.
+class RetrainRequest(msgspec.Struct, frozen=True, forbid_unknown_fields=True):
+    trainer: Annotated[str, msgspec.Meta(min_length=1, max_length=200)]
+    model_type: str = "constant"
+    y_value: float = 1.5
 
-class PredictRequest(BaseModel):
+
+class PredictRequest(msgspec.Struct, frozen=True, forbid_unknown_fields=True):
     # The training code interprets and normalizes units; the value is ignored by constant/mean models.
-    height_cm: float = Field(..., ge=0.0)
+    height_cm: Annotated[float, msgspec.Meta(ge=0.0)]
 
 
-@app.get("/health")
-def health() -> dict[str, Any]:
-    with _state_lock:
-        meta = dict(_production_meta) if _production_meta else {}
+_StructT = TypeVar("_StructT", bound=msgspec.Struct)
 
+
+def _validation_detail(e: msgspec.DecodeError) -> list[dict[str, Any]]:
+    """
+    Build a 422 `detail` in FastAPI's list shape (`[{loc, msg, type}]`).
+
+    msgspec does not expose error locations as data, so there is always exactly one
+    entry with `loc: ["body"]`; the field path is part of `msg` (e.g. "... - at `$.height_cm`").
+    `type` is "json_invalid" for malformed JSON and "value_error" for schema violations.
+    """
+    err_type = "value_error" if isinstance(e, msgspec.ValidationError) else "json_invalid"
+    return [{"loc": ["body"], "msg": str(e), "type": err_type}]
+
+
+def _decode_body(body: bytes, type_: type[_StructT]) -> _StructT:
+    """Decode a JSON request body into `type_`; invalid JSON or fields become HTTP 422."""
+    try:
+        # strict=False keeps pydantic's lax coercion of numeric strings such as "1.7".
+        return msgspec.json.decode(body, type=type_, strict=False)
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=422, detail=_validation_detail(e)) from e
+
+
+def _openapi_body(type_: type[msgspec.Struct]) -> dict[str, Any]:
+    """OpenAPI request body for a Struct, so /docs still documents the payload."""
+    schema = msgspec.json.schema(type_)
+    schema = schema.get("$defs", {}).get(type_.__name__, schema)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": schema}},
+        }
+    }
+
+
+# Handlers return plain JSON-ready dicts; `response_model=None` stops FastAPI from deriving a
+# response model from the `dict[str, Any]` annotation and re-validating every response.
+@app.get("/health", response_model=None)
+def health() -> dict[str, Any]:
+    _, _, meta, _ = _state
     return {"ok": True, "production": meta}
 
 
-@app.post("/retrain")
-def retrain(req: RetrainRequest) -> dict[str, Any]:
+@app.post("/retrain", response_model=None, openapi_extra=_openapi_body(RetrainRequest))
+async def retrain(request: Request) -> dict[str, Any]:
+    req = _decode_body(await request.body(), RetrainRequest)
+    # Training blocks on disk and subprocess I/O; keep it off the event loop.
+    return await run_in_threadpool(_retrain, req)
+
+
+def _retrain(req: RetrainRequest) -> dict[str, Any]:
+    # Imported lazily: the training stack (mlflow, pyarrow, ...) is not needed to serve /predict.
+    from src.train import train_and_promote
+
     try:
         production = train_and_promote(
             trainer=req.trainer,
@@ -101,25 +193,20 @@ def retrain(req: RetrainRequest) -> dict[str, Any]:
 
     _load_model()
 
-    with _state_lock:
-        if _model is None:
-            raise HTTPException(
-                status_code=503,
-                detail=_model_load_error or "Model not available after retrain.",
-            )
-        meta = dict(_production_meta) if _production_meta else dict(production)
-
-    return {"ok": True, "production": meta}
-
+    model_obj, _, meta, err = _state
+    if model_obj is None:
+        raise HTTPException(
+            status_code=503,
+            detail=err or "Model not available after retrain.",
+        )
+    return {"ok": True, "production": meta or production}
 
-@app.post("/predict")
-def predict(req: PredictRequest) -> dict[str, Any]:
-    with _state_lock:
-        model_obj = _model
-        meta = dict(_production_meta) if _production_meta else {}
-        err = _model_load_error
 
-    if model_obj is None:
+@app.post("/predict", response_model=None, openapi_extra=_openapi_body(PredictRequest))
+async def predict(request: Request) -> dict[str, Any]:
+    req = _decode_body(await request.body(), PredictRequest)
+    _, predictor, meta, err = _state
+    if predictor is None:
         raise HTTPException(
             status_code=503,
             detail=err
@@ -127,6 +214,9 @@ def predict(req: PredictRequest) -> dict[str, Any]:
         )
 
     # The constant and mean models both ignore the input, but we keep the API stable.
-    y = float(model_obj.predict_one(req.height_cm))
+    # Rounding bounds the cache key space; sub-millimetre differences are not meaningful.
+    # A cache miss calls `predict_one`, which may be real work for array-bearing models;
+    # like a sync endpoint, run it in the threadpool rather than on the event loop.
+    y = await run_in_threadpool(predictor, round(req.height_cm, 3))
     return {"y": y, "model": meta}
 
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import re
+
+# `md5:` of the first entry under `outs:` in a `.dvc` pointer file. Only keys at that entry's
+# own indentation match; nested or unusual layouts miss and fall through to YAML.
+DVC_OUTS_MD5_RE = re.compile(
+    r"^outs:[ \t]*\r?\n-( +)(?:[^\n]*\n \1)*?"
+    r"md5:[ \t]*(?P<md5>[0-9a-fA-F]+(?:\.dir)?)[ \t]*\r?$",
+    re.M,
+)
+
+
+def read_outs_md5(text: str) -> str:
+    """
+    Return `outs[0].md5` from the text of a `.dvc` pointer file, or "" if absent or invalid.
+
+    DVC writes these pointers in a fixed layout, so the field is pulled out with a
+    regex; PyYAML is only imported if that does not match.
+    """
+    match = DVC_OUTS_MD5_RE.search(text)
+    if match:
+        return match.group("md5")
+
+    try:
+        import yaml
+
+        doc = yaml.safe_load(text)
+    except Exception:
+        return ""
+    if not isinstance(doc, dict):
+        return ""
+
+    outs = doc.get("outs")
+    if not isinstance(outs, list) or not outs:
+        return ""
+
+    first = outs[0]
+    if not isinstance(first, dict):
+        return ""
+
+    md5 = first.get("md5")
+    return str(md5) if md5 else ""
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import errno
 import json
 import os
+import sys
 import tempfile
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson
+except ImportError:
+    # Optional speedup; the stdlib encoder produces equivalent output.
+    orjson = None
+
 
 def _project_root(root: Path | None = None) -> Path:
     if root is not None:
@@ -14,6 +22,69 @@ def _project_root(root: Path | None = None) -> Path:
     return Path(__file__).resolve().parents[1]
 
 
+def _sync_file(fd: int) -> None:
+    """Flush file contents to stable storage using the cheapest durable call per platform."""
+    if sys.platform == "darwin":
+        # On macOS `fsync` does not flush the drive cache; F_FULLFSYNC does.
+        import fcntl
+
+        try:
+            fcntl.fcntl(fd, fcntl.F_FULLFSYNC)
+            return
+        except OSError:
+            pass  # Not supported by this filesystem; fall back to fsync.
+    elif hasattr(os, "fdatasync"):
+        # Skips flushing timestamp-only inode metadata.
+        os.fdatasync(fd)
+        return
+    os.fsync(fd)
+
+
+# errnos meaning "directories cannot be opened/fsynced here" rather than a failed write.
+_DIR_OPEN_UNSUPPORTED = {errno.EACCES}
+_DIR_FSYNC_UNSUPPORTED = {errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def _sync_dir(path: Path) -> None:
+    """
+    fsync a directory so a rename inside it survives a crash.
+
+    No-op where the platform or filesystem cannot do this (e.g. Windows); real I/O
+    errors such as EIO propagate, since the rename may then not be durable.
+    """
+    try:
+        dir_fd = os.open(str(path), os.O_RDONLY)
+    except OSError as e:
+        if e.errno in _DIR_OPEN_UNSUPPORTED:
+            return
+        raise
+    try:
+        os.fsync(dir_fd)
+    except OSError as e:
+        if e.errno not in _DIR_FSYNC_UNSUPPORTED:
+            raise
+    finally:
+        os.close(dir_fd)
+
+
+def _dumps_production(meta: dict[str, Any]) -> bytes:
+    """Encode production metadata as sorted, 2-space indented UTF-8 JSON with a trailing newline."""
+    if orjson is not None:
+        return orjson.dumps(
+            meta,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE,
+        )
+    return (json.dumps(meta, sort_keys=True, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _dumps_log_line(entry: dict[str, Any]) -> bytes:
+    """Encode one compact, key-sorted JSONL line (with trailing newline)."""
+    if orjson is not None:
+        return orjson.dumps(entry, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    line = json.dumps(entry, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return (line + "\n").encode("utf-8")
+
+
 def ensure_dirs(root: Path | None = None) -> dict[str, Path]:
     """Create required directories if missing."""
     root_dir = _project_root(root)
@@ -38,10 +109,10 @@ def read_production(root: Path | None = None) -> dict[str, Any]:
         return {}
 
     try:
-        raw = path.read_text(encoding="utf-8").strip()
+        raw = path.read_bytes().strip()
         if not raw:
             return {}
-        data = json.loads(raw)
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         return data if isinstance(data, dict) else {}
     except Exception:
         return {}
@@ -51,12 +122,13 @@ def write_production(meta: dict[str, Any], root: Path | None = None) -> Path:
     """
     Atomically write `metadata/production.json` as the single source of truth.
 
-    Implementation: write to temp file next to target, then `os.replace`.
+    Implementation: write to temp file next to target, sync its data, `os.replace`
+    it over the target, then fsync the directory so the rename itself is durable.
     """
     dirs = ensure_dirs(root)
     target = dirs["metadata"] / "production.json"
 
-    payload = json.dumps(meta, sort_keys=True, indent=2, ensure_ascii=False) + "\n"
+    payload = _dumps_production(meta)
 
     fd, tmp_path = tempfile.mkstemp(
         prefix="production.",
@@ -64,12 +136,13 @@ def write_production(meta: dict[str, Any], root: Path | None = None) -> Path:
         dir=str(dirs["metadata"]),
     )
     try:
-        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+        with os.fdopen(fd, "wb") as f:
             f.write(payload)
             f.flush()
-            os.fsync(f.fileno())
+            _sync_file(f.fileno())
 
         os.replace(tmp_path, target)
+        _sync_dir(dirs["metadata"])
     finally:
         # If anything failed before replace, try to remove the temp file.
         try:
@@ -82,15 +155,27 @@ def write_production(meta: dict[str, Any], root: Path | None = None) -> Path:
 
 
 def append_retrain_log(entry: dict[str, Any], root: Path | None = None) -> Path:
-    """Append a JSONL line to `metadata/retrain_log.jsonl`."""
+    """
+    Append a JSONL line to `metadata/retrain_log.jsonl`.
+
+    The log is append-only history, not the source of truth, so it is not fsynced
+    by default. Set `DURABLE_RETRAIN_LOG=1` to sync every append; the directory is
+    also fsynced when the append created the file, so the new entry is durable too.
+    """
     dirs = ensure_dirs(root)
     path = dirs["metadata"] / "retrain_log.jsonl"
+    durable = os.getenv("DURABLE_RETRAIN_LOG") == "1"
+    created = durable and not path.exists()
+
+    line = _dumps_log_line(entry)
+    with path.open("ab") as f:
+        f.write(line)
+        if durable:
+            f.flush()
+            _sync_file(f.fileno())
 
-    line = json.dumps(entry, sort_keys=True, ensure_ascii=False)
-    with path.open("a", encoding="utf-8", newline="\n") as f:
-        f.write(line + "\n")
-        f.flush()
-        os.fsync(f.fileno())
+    if created:
+        _sync_dir(dirs["metadata"])
 
     return path
 
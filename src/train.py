@@ -2,18 +2,28 @@ from __future__ import annotations
 
 import csv
 import os
+import re
 import subprocess
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
-import joblib
-import mlflow
-import yaml
-
+from src.dvc_meta import read_outs_md5
 from src.model import ConstantModel, MeanModel
 from src.registry import append_retrain_log, ensure_dirs, write_production
 
+# mlflow, joblib and pyarrow are imported inside the functions that
+# use them so that importing this module stays cheap; mlflow alone adds seconds to a cold start.
+
+_GIT_SHA_RE = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+# (monotonic timestamp, sha) of the last HEAD lookup; reused for `_GIT_SHA_TTL_S` seconds.
+_GIT_SHA_TTL_S = 5.0
+_git_sha_cache: tuple[float, str] | None = None
+
 
 def _project_root() -> Path:
     # .../traceable-demo/src/train.py -> .../traceable-demo
@@ -24,17 +34,68 @@ def _utc_iso_now() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
 
 
-def _get_git_commit_sha() -> str:
-    """Return `git rev-parse HEAD`, or empty string if unavailable."""
+def _read_git_head(root_dir: Path) -> str:
+    """
+    Resolve HEAD by reading `.git/HEAD` (and loose or packed refs) directly.
+    Returns empty string for layouts this does not handle (e.g. worktrees).
+    """
+    git_dir = root_dir / ".git"
+    if not git_dir.is_dir():
+        return ""
+
+    head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    if not head.startswith("ref: "):
+        # Detached HEAD: the file holds the SHA itself.
+        return head if _GIT_SHA_RE.fullmatch(head) else ""
+
+    ref = head[len("ref: ") :].strip()
+    ref_path = git_dir / ref
+    if ref_path.is_file():
+        sha = ref_path.read_text(encoding="utf-8").strip()
+        return sha if _GIT_SHA_RE.fullmatch(sha) else ""
+
+    packed_refs = git_dir / "packed-refs"
+    if packed_refs.is_file():
+        for line in packed_refs.read_text(encoding="utf-8").splitlines():
+            sha, _, name = line.partition(" ")
+            if name == ref and _GIT_SHA_RE.fullmatch(sha):
+                return sha
+
+    return ""
+
+
+def _get_git_commit_sha(root_dir: Path) -> str:
+    """
+    Return the commit SHA of HEAD, or empty string if unavailable.
+
+    Reads the `.git` files directly and only falls back to `git rev-parse HEAD` when
+    that fails. The result is cached for a few seconds across calls.
+    """
+    global _git_sha_cache
+
+    now = time.monotonic()
+    if _git_sha_cache is not None and now - _git_sha_cache[0] < _GIT_SHA_TTL_S:
+        return _git_sha_cache[1]
+
     try:
-        out = subprocess.check_output(
-            ["git", "rev-parse", "HEAD"],
-            stderr=subprocess.DEVNULL,
-            text=True,
-        )
-        return out.strip()
+        sha = _read_git_head(root_dir)
     except Exception:
-        return ""
+        sha = ""
+
+    if not sha:
+        try:
+            out = subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=str(root_dir),
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            sha = out.strip()
+        except Exception:
+            sha = ""
+
+    _git_sha_cache = (now, sha)
+    return sha
 
 
 def _get_data_dvc_md5(root_dir: Path) -> str:
@@ -47,22 +108,23 @@ def _get_data_dvc_md5(root_dir: Path) -> str:
         return ""
 
     try:
-        doc = yaml.safe_load(dvc_path.read_text(encoding="utf-8"))
-        if not isinstance(doc, dict):
-            return ""
+        return read_outs_md5(dvc_path.read_text(encoding="utf-8"))
+    except Exception:
+        return ""
 
-        outs = doc.get("outs")
-        if not isinstance(outs, list) or not outs:
-            return ""
 
-        first = outs[0]
-        if not isinstance(first, dict):
-            return ""
+def _configure_mlflow(root_dir: Path) -> None:
+    """Point MLflow at the tracking server (or the local file store) and select the experiment."""
+    import mlflow
 
-        md5 = first.get("md5")
-        return str(md5) if md5 else ""
-    except Exception:
-        return ""
+    # Respect external MLflow tracking URI when provided, otherwise use local file store.
+    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
+    if tracking_uri:
+        mlflow.set_tracking_uri(tracking_uri)
+    else:
+        mlflow.set_tracking_uri(f"file:{(root_dir / 'mlruns').as_posix()}")
+
+    mlflow.set_experiment("family-heights-traceable-demo")
 
 
 def _ensure_dataset_materialized(root_dir: Path) -> Path:
@@ -108,60 +170,128 @@ def _ensure_dataset_materialized(root_dir: Path) -> Path:
     )
 
 
-def _read_heights_csv_normalized(csv_path: Path) -> list[float]:
+def _height_stats_from_rows(csv_path: Path, height_idx: int) -> tuple[int, float, float]:
     """
-    Read heights from CSV and normalize to meters in a canonical `height_m` column.
+    Return `(count, mean, max)` of the raw height column using the csv module.
+
+    Slow path for files Arrow rejects: rows with more or fewer fields than the header
+    (rows too short to contain the column are skipped and extra fields are ignored, as
+    `csv.DictReader` did), and cells Arrow cannot cast, so the error names the data row.
+    """
+    count = 0
+    total = 0.0
+    max_val = float("-inf")
+    with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+
+        row_num = 0
+        for row in reader:
+            # Blank lines are skipped without counting as data rows (as DictReader did).
+            if not row:
+                continue
+            row_num += 1
+            raw = row[height_idx].strip() if height_idx < len(row) else ""
+            if not raw:
+                continue
+            try:
+                value = float(raw)
+            except Exception as e:
+                raise ValueError(
+                    f"Invalid height value on data row {row_num}: {raw!r}"
+                ) from e
+            count += 1
+            total += value
+            max_val = max(max_val, value)
+
+    return count, (total / count if count else 0.0), max_val
+
+
+def _read_heights_csv_normalized(csv_path: Path) -> tuple[int, float]:
+    """
+    Read heights from CSV and return `(n_rows, mean_height_m)`, normalized to meters.
 
     Accepts one of: `height_cm`, `height_m`, or `height`.
     If values look like centimeters (> 10), convert to meters by dividing by 100.
     If values look like meters (<= 10), keep as is.
+    Only the count, max and mean are computed; no per-row normalized copy is built.
     """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
     if not csv_path.exists():
         raise FileNotFoundError(f"Dataset not found: {csv_path}")
 
-    heights_raw: list[float] = []
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        if reader.fieldnames is None:
-            raise ValueError("CSV has no header row")
-
-        columns = {name.strip(): name for name in reader.fieldnames}
-        candidate_names = ["height_cm", "height_m", "height"]
-        height_col_key = None
-        for cand in candidate_names:
-            if cand in columns:
-                height_col_key = columns[cand]
-                break
-
-        if height_col_key is None:
-            raise ValueError(
-                "CSV is missing a height column. Expected one of: "
-                "'height_cm', 'height_m', or 'height'."
-            )
+    # Only the header is read in Python, to resolve the column despite stray whitespace.
+    with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), None)
+    if header is None:
+        raise ValueError("CSV has no header row")
+
+    columns = {name.strip(): name for name in header}
+    candidate_names = ["height_cm", "height_m", "height"]
+    height_col = None
+    for cand in candidate_names:
+        if cand in columns:
+            height_col = columns[cand]
+            break
+
+    if height_col is None:
+        raise ValueError(
+            "CSV is missing a height column. Expected one of: "
+            "'height_cm', 'height_m', or 'height'."
+        )
 
-        for i, row in enumerate(reader, start=1):
-            raw = (row.get(height_col_key) or "").strip()
-            if not raw:
-                continue
-            try:
-                heights_raw.append(float(raw))
-            except Exception as e:
-                raise ValueError(
-                    f"Invalid height value on data row {i}: {raw!r}"
-                ) from e
+    # Parse the single column in Arrow's C++ reader. Values are read as text and then
+    # trimmed and cast, so padded or blank cells behave as they do with the csv module.
+    # Arrow cannot keep rows whose field count differs from the header; those are noted
+    # here and the whole file is re-read with the csv module instead.
+    ragged_rows: list[int] = []
 
-    if not heights_raw:
-        raise ValueError("CSV contained 0 valid height values")
+    def _on_invalid_row(row: Any) -> str:
+        ragged_rows.append(row.number)
+        return "skip"
 
-    max_val = max(heights_raw)
-    if max_val > 10:
-        # Treat as centimeters -> convert to meters.
-        heights_m = [v / 100.0 for v in heights_raw]
+    try:
+        table = pacsv.read_csv(
+            csv_path,
+            parse_options=pacsv.ParseOptions(invalid_row_handler=_on_invalid_row),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=[height_col],
+                column_types={height_col: pa.string()},
+            ),
+        )
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Malformed CSV {csv_path.name}: {e}") from e
+
+    heights = None
+    if not ragged_rows:
+        raw = pc.utf8_trim_whitespace(table.column(0))
+        try:
+            heights = pc.cast(raw.filter(pc.not_equal(raw, "")), pa.float64())
+        except pa.ArrowInvalid:
+            # Fall through to the csv module, which reports the offending data row.
+            heights = None
+
+    if heights is None:
+        n_rows, mean_height, max_height = _height_stats_from_rows(
+            csv_path, header.index(height_col)
+        )
     else:
-        # Already in meters.
-        heights_m = list(heights_raw)
+        n_rows = len(heights)
+        mean_height = pc.mean(heights).as_py() if n_rows else 0.0
+        max_height = pc.max(heights).as_py() if n_rows else 0.0
+
+    if n_rows == 0:
+        raise ValueError("CSV contained 0 valid height values")
+
+    if max_height > 10:
+        # Treat as centimeters -> convert to meters. Scaling the mean equals the mean of scaled values.
+        mean_height /= 100.0
+    # Otherwise already in meters.
 
-    return heights_m
+    return n_rows, float(mean_height)
 
 
 def train_and_promote(
@@ -182,6 +312,8 @@ def train_and_promote(
     - git commit SHA (if git is available)
     - mlflow run_id (artifact source of truth for the model)
     """
+    import joblib
+
     trainer_clean = (trainer or "").strip()
     if not trainer_clean:
         raise ValueError("trainer must be a non-empty string")
@@ -194,38 +326,41 @@ def train_and_promote(
     ensure_dirs(root_dir)
 
     data_path = _ensure_dataset_materialized(root_dir)
-    heights_m = _read_heights_csv_normalized(data_path)
 
-    n_rows = int(len(heights_m))
-    mean_height_m = float(sum(heights_m) / n_rows)
+    # Traceability lookups and MLflow setup (including the mlflow import) are I/O bound and
+    # independent of the dataset, so they run while the CSV is parsed.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        dvc_md5_future = pool.submit(_get_data_dvc_md5, root_dir)
+        git_commit_future = pool.submit(_get_git_commit_sha, root_dir)
+        mlflow_future = pool.submit(_configure_mlflow, root_dir)
 
-    data_dvc_md5 = _get_data_dvc_md5(root_dir)
-    git_commit = _get_git_commit_sha()
+        n_rows, mean_height_m = _read_heights_csv_normalized(data_path)
 
-    # Respect external MLflow tracking URI when provided, otherwise use local file store.
-    tracking_uri = os.getenv("MLFLOW_TRACKING_URI")
-    if tracking_uri:
-        mlflow.set_tracking_uri(tracking_uri)
-    else:
-        mlflow.set_tracking_uri(f"file:{(root_dir / 'mlruns').as_posix()}")
+        data_dvc_md5 = dvc_md5_future.result()
+        git_commit = git_commit_future.result()
+        mlflow_future.result()
 
-    mlflow.set_experiment("family-heights-traceable-demo")
+    import mlflow
 
     model_path = root_dir / "models" / "production" / "model.pkl"
     model_rel_path = model_path.relative_to(root_dir).as_posix()
 
-    with mlflow.start_run() as run:
+    # System metrics would start a background sampler thread for this short-lived run.
+    with mlflow.start_run(log_system_metrics=False) as run:
         run_id = run.info.run_id
 
-        mlflow.log_param("model_type", model_type_clean)
-        mlflow.log_param("trainer", trainer_clean)
-        mlflow.log_param("data_dvc_md5", data_dvc_md5)
-        mlflow.log_param("git_commit", git_commit)
+        # Batched: one tracking-store write for params and one for metrics.
+        params: dict[str, Any] = {
+            "model_type": model_type_clean,
+            "trainer": trainer_clean,
+            "data_dvc_md5": data_dvc_md5,
+            "git_commit": git_commit,
+        }
         if model_type_clean == "constant":
-            mlflow.log_param("y_value", float(y_value))
+            params["y_value"] = float(y_value)
+        mlflow.log_params(params)
 
-        mlflow.log_metric("n_rows", n_rows)
-        mlflow.log_metric("mean_height_m", mean_height_m)
+        mlflow.log_metrics({"n_rows": n_rows, "mean_height_m": mean_height_m})
 
         if model_type_clean == "constant":
             model = ConstantModel(y_value=float(y_value))
@@ -235,7 +370,25 @@ def train_and_promote(
             # The model predicts the dataset mean; expose it as y_value for traceability.
             effective_y_value = mean_height_m
 
-        joblib.dump(model, model_path)
+        # Uncompressed + protocol 5 keeps loads cheap and lets `joblib.load(mmap_mode="r")`
+        # memory-map any array buffers a future model carries. The dump goes to a temp file
+        # that replaces `model.pkl`: API workers may still have the old file mapped, and
+        # rewriting it in place would pull those pages out from under them.
+        # joblib creates the temp file itself, so it gets the same umask-derived mode that
+        # `model.pkl` always had (mkstemp would force 0600). The random name avoids collisions.
+        tmp_model_path = str(model_path.with_name(f"model.{uuid.uuid4().hex}.pkl.tmp"))
+        try:
+            # Pinned rather than pickle.HIGHEST_PROTOCOL: workers on an older interpreter than
+            # the trainer must still be able to unpickle the model.
+            joblib.dump(model, tmp_model_path, compress=0, protocol=5)
+            os.replace(tmp_model_path, model_path)
+        finally:
+            # If anything failed before replace, try to remove the temp file.
+            try:
+                if os.path.exists(tmp_model_path):
+                    os.remove(tmp_model_path)
+            except OSError:
+                pass
 
         # Artifact path "model" -> .../artifacts/model/model.pkl
         mlflow.log_artifact(str(model_path), artifact_path="model")
@@ -1,17 +1,23 @@
 import json
 import os
 import subprocess
+import sys
 from pathlib import Path
 
 import pandas as pd
 import requests
 import streamlit as st
-import yaml
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DATA_CSV = REPO_ROOT / "data" / "family_heights.csv"
 DATA_DVC = REPO_ROOT / "data" / "family_heights.csv.dvc"
 
+# `streamlit run ui/streamlit_app.py` only puts `ui/` on sys.path; `src` lives at the repo root.
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from src.dvc_meta import read_outs_md5  # noqa: E402
+
 
 def _default_api_base() -> str:
     env_base = os.getenv("API_BASE")
@@ -33,20 +39,34 @@ def run_cmd(cmd: list[str]) -> tuple[int, str]:
         return 1, str(e)
 
 
+# Streamlit reruns the script on every widget change; `dvc status` alone costs ~1s per run.
+# Read-only commands are cached briefly and cleared by the buttons that change their output.
+@st.cache_data(ttl=10, show_spinner=False)
+def dvc_status() -> tuple[int, str]:
+    return run_cmd(["dvc", "status"])
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def dataset_git_log() -> tuple[int, str]:
+    return run_cmd(
+        ["git", "log", "-n", "10", "--oneline", "--", "data/family_heights.csv.dvc"]
+    )
+
+
 def read_dvc_md5() -> str:
     if not DATA_DVC.exists():
         return ""
     try:
-        d = yaml.safe_load(DATA_DVC.read_text(encoding="utf-8"))
+        return read_outs_md5(DATA_DVC.read_text(encoding="utf-8"))
     except Exception:
         return ""
-    if not isinstance(d, dict):
-        return ""
-    outs = d.get("outs", [])
-    if not outs:
-        return ""
-    first = outs[0] or {}
-    return first.get("md5", "") or ""
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_df(path: str, mtime_ns: int) -> pd.DataFrame:
+    # `mtime_ns` only feeds the cache key, so saving the CSV invalidates the cached frame.
+    _ = mtime_ns
+    return pd.read_csv(path, engine="pyarrow")
 
 
 def api_get(base_url: str, path: str):
@@ -81,7 +101,7 @@ with col_data:
     st.subheader("Dataset")
 
     if DATA_CSV.exists():
-        df = pd.read_csv(DATA_CSV)
+        df = load_df(str(DATA_CSV), DATA_CSV.stat().st_mtime_ns)
     else:
         st.warning(
             "Dataset file not found on disk. If you use DVC, run: dvc pull data/family_heights.csv"
@@ -94,12 +114,13 @@ with col_data:
 
     with c1:
         if st.button("Save CSV", use_container_width=True):
-            edited.to_csv(DATA_CSV, index=False)
+            edited.to_csv(DATA_CSV, index=False, lineterminator="\n")
+            dvc_status.clear()
             st.success("Saved data/family_heights.csv")
 
     with c2:
         if st.button("Commit dataset (DVC + git)", use_container_width=True):
-            edited.to_csv(DATA_CSV, index=False)
+            edited.to_csv(DATA_CSV, index=False, lineterminator="\n")
             code_add, out_add = run_cmd(["dvc", "add", "data/family_heights.csv"])
 
             code_git_add, out_git_add = run_cmd(
@@ -155,6 +176,9 @@ with col_data:
                 else:
                     st.warning("dvc push failed; see output below.")
 
+            dvc_status.clear()
+            dataset_git_log.clear()
+
             if code_add == 0:
                 st.success("DVC pointer updated")
             else:
@@ -165,6 +189,7 @@ with col_data:
     with c3:
         if st.button("DVC pull dataset", use_container_width=True):
             code_pull, out_pull = run_cmd(["dvc", "pull", "data/family_heights.csv"])
+            dvc_status.clear()
             if code_pull == 0:
                 st.success("dvc pull successful")
             else:
@@ -174,14 +199,12 @@ with col_data:
     st.markdown("### DVC info")
     st.write(f"Current DVC md5: `{read_dvc_md5()}`")
 
-    code_status, out_status = run_cmd(["dvc", "status"])
+    code_status, out_status = dvc_status()
     st.markdown("`dvc status`:")
     st.code(out_status or "(no output)")
 
     st.markdown("### Dataset history (git log of .dvc pointer)")
-    code_log, out_log = run_cmd(
-        ["git", "log", "-n", "10", "--oneline", "--", "data/family_heights.csv.dvc"]
-    )
+    code_log, out_log = dataset_git_log()
     st.code(out_log or "(no output)")
 
 with col_model: